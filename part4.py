@@ -90,6 +90,339 @@ user_service2.register()
 
 # =======================================
 
+# Bulk registration
+# register() builds a new EmailSender for every user and sends right away.
+# register_many streams users through validate -> deduplicate -> persist in
+# batches, and queues welcome emails on one shared sender that sends them in
+# batches of its own size. Counters and throughput are kept on `metrics`, and
+# an optional callback is told about progress after every persisted batch.
+
+import time
+from itertools import islice
+
+class EmailSender:
+
+    def send(self, recipient, message):
+        print("Sending email", recipient, message)
+
+    def send_many(self, messages, idempotency_keys=None):
+        # Senders that can talk to the server in bulk override this. A provider
+        # that supports idempotency keys drops a message whose key it has already
+        # seen; printing can't, so the keys are ignored here.
+        for recipient, message in messages:
+            self.send(recipient, message)
+
+class InMemoryUserRepository:
+    def __init__(self):
+        self.users: dict[str, User] = {}
+
+    def save_many(self, users):
+        for user in users:
+            self.users[user.username] = user
+
+class RegistrationMetrics:
+    def __init__(self):
+        self.processed = 0
+        self.registered = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self.emails_sent = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self):
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return (f"RegistrationMetrics(processed={self.processed}, registered={self.registered}, "
+                f"invalid={self.invalid}, duplicates={self.duplicates}, emails_sent={self.emails_sent}, "
+                f"rate={self.rate:,.0f}/s)")
+
+class UserService:
+
+    def __init__(self, email_sender: EmailSender, repository=None, batch_size=1_000, email_batch_size=500):
+        self.email_sender = email_sender
+        self.repository = repository if repository is not None else InMemoryUserRepository()
+        self.batch_size = batch_size
+        self.email_batch_size = email_batch_size
+        self.metrics = RegistrationMetrics()
+        self._seen_usernames: set[str] = set()
+        self._seen_emails: set[str] = set()
+        self._outbox: list[tuple[str, str]] = []
+
+    def register(self, user):
+        self.register_many([user])
+
+    def register_many(self, users, on_progress=None):
+        users = iter(users)
+        while chunk := list(islice(users, self.batch_size)):
+            batch = [user for user in chunk if self._accept(user)]
+            self.metrics.processed += len(chunk)
+            if batch:
+                self.repository.save_many(batch)
+                self.metrics.registered += len(batch)
+                self._outbox.extend((user.email, f"Welcome {user.username}") for user in batch)
+                self._send_welcome_emails(flush=False)
+            if on_progress is not None:
+                on_progress(self.metrics)
+        self._send_welcome_emails(flush=True)
+        return self.metrics
+
+    def _accept(self, user):
+        email = user.email.lower().strip()
+        if not user.username or "@" not in email:
+            self.metrics.invalid += 1
+            return False
+        if user.username in self._seen_usernames or email in self._seen_emails:
+            self.metrics.duplicates += 1
+            return False
+        self._seen_usernames.add(user.username)
+        self._seen_emails.add(email)
+        return True
+
+    def _send_welcome_emails(self, flush):
+        size = self.email_batch_size
+        while len(self._outbox) >= size or (flush and self._outbox):
+            batch, self._outbox = self._outbox[:size], self._outbox[size:]
+            self.email_sender.send_many(batch)
+            self.metrics.emails_sent += len(batch)
+
+
+class CountingEmailSender(EmailSender):
+    # Stand-in for a bulk email API, so the demo doesn't print 500k lines
+    def __init__(self):
+        self.batches = 0
+
+    def send_many(self, messages, idempotency_keys=None):
+        self.batches += 1
+
+user_service = UserService(EmailSender())
+user_service.register(User("dantheman", "dan@gmail.com"))
+
+sender = CountingEmailSender()
+user_service = UserService(sender, batch_size=5_000, email_batch_size=1_000)
+users = (User(f"user{i % 450_000}", f"user{i}@example.com" if i % 1_000 else "not-an-email") for i in range(500_000))
+metrics = user_service.register_many(users)
+print(metrics, "email batches:", sender.batches)
+
+# =======================================
+
+# Durable email outbox
+# Anything handed to EmailSender.send is lost if the process dies before it
+# goes out. OutboxSpool makes enqueue a single unbuffered append to a local log
+# file, so a message survives a process crash once enqueue returns. An
+# OutboxFlusher thread reads the log in large batches, delivers them and
+# checkpoints the offset it reached. Every message carries an increasing id, and
+# the checkpoint stores the last delivered one. A crash between delivering and
+# checkpointing replays only that last batch, so delivery is at-least-once.
+# It becomes exactly-once only when the receiver drops repeats by id, like
+# DeduplicatingInbox below. email_sender_delivery passes each id on as an
+# idempotency key, which gives exactly-once only if the sender's provider
+# honours those keys. The printing EmailSender doesn't, so a replayed batch is
+# sent again.
+
+import json
+import os
+import struct
+import tempfile
+import threading
+
+class OutboxSpool:
+    HEADER = struct.Struct("<QI")       # message id, payload length
+
+    def __init__(self, directory, fsync=False):
+        self.log_path = os.path.join(directory, "outbox.log")
+        self.checkpoint_path = os.path.join(directory, "outbox.checkpoint")
+        self.fsync = fsync
+        self._lock = threading.Lock()
+
+        self.offset, self.last_delivered = self._read_checkpoint()
+        self._next_id = self._repair() + 1
+        self._file = open(self.log_path, "ab", buffering=0)
+
+    def _read_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path):
+            return 0, 0
+        with open(self.checkpoint_path) as f:
+            state = json.load(f)
+        return state["offset"], state["last_delivered"]
+
+    def _repair(self):
+        # Find the last complete record and cut off anything torn by a crash
+        last_id = self.last_delivered
+        if not os.path.exists(self.log_path):
+            return last_id
+        with open(self.log_path, "r+b") as f:
+            f.seek(self.offset)
+            position = self.offset
+            for message_id, _, _, end in self._records(f):
+                last_id, position = message_id, end
+            f.truncate(position)
+        return last_id
+
+    def _records(self, f, limit=None):
+        # Yields (id, recipient, message, end offset) from the current position
+        position = f.tell()
+        count = 0
+        while limit is None or count < limit:
+            header = f.read(self.HEADER.size)
+            if len(header) < self.HEADER.size:
+                break
+            message_id, length = self.HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                break
+            position += self.HEADER.size + length
+            recipient, _, message = payload.decode().partition("\0")
+            yield message_id, recipient, message, position
+            count += 1
+
+    def enqueue(self, recipient, message):
+        payload = f"{recipient}\0{message}".encode()
+        with self._lock:
+            message_id = self._next_id
+            self._next_id += 1
+            # One write() per record, so a crash can only ever tear the last one
+            self._file.write(self.HEADER.pack(message_id, len(payload)) + payload)
+            if self.fsync:
+                os.fsync(self._file.fileno())
+        return message_id
+
+    def read_batch(self, max_messages):
+        with open(self.log_path, "rb") as f:
+            f.seek(self.offset)
+            records = list(self._records(f, max_messages))
+        batch = [(message_id, recipient, message) for message_id, recipient, message, _ in records
+                 if message_id > self.last_delivered]
+        end = records[-1][3] if records else self.offset
+        return batch, end
+
+    def acknowledge(self, end, last_id):
+        self._write_checkpoint(end, max(last_id, self.last_delivered))
+        with self._lock:
+            # Everything delivered: start the log over instead of letting it grow forever
+            if self.offset == os.path.getsize(self.log_path):
+                self._file.truncate(0)
+                self._write_checkpoint(0, self.last_delivered)
+
+    def _write_checkpoint(self, offset, last_delivered):
+        temp_path = self.checkpoint_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"offset": offset, "last_delivered": last_delivered}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.checkpoint_path)   # atomic, a crash leaves the old checkpoint
+        self.offset, self.last_delivered = offset, last_delivered
+
+    def pending(self):
+        return self._next_id - 1 - self.last_delivered
+
+    def close(self):
+        self._file.close()
+
+
+class OutboxFlusher:
+    def __init__(self, spool: OutboxSpool, deliver, batch_size=1_000, interval=0.05):
+        # deliver receives a list of (message_id, recipient, message)
+        self.spool = spool
+        self.deliver = deliver
+        self.batch_size = batch_size
+        self.interval = interval
+        self.delivered = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def flush_once(self):
+        batch, end = self.spool.read_batch(self.batch_size)
+        if batch:
+            self.deliver(batch)
+            self.delivered += len(batch)
+        if end != self.spool.offset:
+            self.spool.acknowledge(end, batch[-1][0] if batch else 0)
+        return len(batch)
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self.flush_once():
+                self._stop.wait(self.interval)
+
+    def stop(self):
+        # Drain what's left, then stop
+        self._stop.set()
+        self._thread.join()
+        while self.flush_once():
+            pass
+
+
+def email_sender_delivery(sender: EmailSender, key_prefix: str = "outbox"):
+    # Ids restart in every spool directory, so the prefix should name the spool
+    def deliver(batch):
+        sender.send_many([(recipient, message) for _, recipient, message in batch],
+                         idempotency_keys=[f"{key_prefix}-{message_id}" for message_id, _, _ in batch])
+    return deliver
+
+class DeduplicatingInbox:
+    # Receiving side: remembers the highest message id it has accepted
+    def __init__(self):
+        self.received = 0
+        self.duplicates = 0
+        self._last_id = 0
+
+    def deliver(self, batch):
+        for message_id, recipient, message in batch:
+            if message_id <= self._last_id:
+                self.duplicates += 1
+                continue
+            self._last_id = message_id
+            self.received += 1
+
+
+with tempfile.TemporaryDirectory() as directory:
+    inbox = DeduplicatingInbox()
+    spool = OutboxSpool(directory)
+    for i in range(2_500):
+        spool.enqueue(f"user{i}@example.com", f"Welcome user{i}")
+
+    # Simulate a crash: the first batch is delivered, the process dies before the checkpoint
+    batch, _ = spool.read_batch(1_000)
+    inbox.deliver(batch)
+    spool.close()
+
+    spool = OutboxSpool(directory)
+    flusher = OutboxFlusher(spool, inbox.deliver)
+    while flusher.flush_once():
+        pass
+    print(f"after crash and replay: {inbox.received} delivered once, {inbox.duplicates} repeats dropped, {spool.pending()} pending")
+    spool.close()
+
+    spool = OutboxSpool(directory)
+    n = 50_000
+    latencies = []
+    for i in range(n):
+        start = time.perf_counter()
+        spool.enqueue(f"user{i}@example.com", f"Welcome user{i}")
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    sender = CountingEmailSender()
+    flusher = OutboxFlusher(spool, email_sender_delivery(sender), batch_size=5_000)
+    start = time.perf_counter()
+    flusher.start()
+    flusher.stop()
+    drain_time = time.perf_counter() - start
+    spool.close()
+    print(f"enqueue p50 {latencies[n // 2] * 1e6:.1f}us, p99 {latencies[n * 99 // 100] * 1e6:.1f}us; "
+          f"drained {flusher.delivered:,} messages at {flusher.delivered / drain_time:,.0f}/s")
+
+# =======================================
+
 # Bad Open/Close Principle (OCP)
 
 from enum import Enum
@@ -158,6 +491,160 @@ rect = Rectangle(height=4, width=6)
 print("circle", circle.calculate_area())
 print("rect", rect.calculate_area())
 
+# =======================================
+
+# OCP at scale: batch area computation
+# Calling calculate_area() once per object is fine for a handful of shapes,
+# but not for millions. ShapeBatch keeps each attribute in a typed column
+# (array of doubles) grouped by concrete type and runs one kernel per type.
+# New shapes register their own kernel, so ShapeBatch itself never changes.
+# The kernels are plain comprehensions over the columns, so nothing here is
+# vectorized. Copying existing objects into columns costs more than one
+# calculate_area() pass, so the batch pays off when shapes arrive as column
+# data (add_columns) and the columns stay the primary store.
+
+from array import array
+from itertools import compress, count, repeat
+import operator
+import time
+
+class ShapeBatch:
+    _kernels: dict = {}     # shape class -> (column names, kernel)
+    _resolved: dict = {}    # concrete class -> registered class, filled by _lookup
+
+    @classmethod
+    def register(cls, shape_type: type, columns: tuple[str, ...], kernel):
+        cls._kernels[shape_type] = (columns, kernel)
+        cls._resolved.clear()
+
+    @classmethod
+    def _lookup(cls, shape_type: type):
+        key = cls._resolved.get(shape_type)
+        if key is not None:
+            return key
+        # Subclasses without their own kernel fall back to the nearest registered parent
+        for klass in shape_type.__mro__:
+            if klass in cls._kernels:
+                cls._resolved[shape_type] = klass
+                return klass
+        raise TypeError(f"No batch kernel registered for {shape_type.__name__}")
+
+    def _group(self, key):
+        group = self._groups.get(key)
+        if group is None:
+            columns, _ = self._kernels[key]
+            group = self._groups[key] = {column: array('d') for column in columns}
+            self._positions[key] = array('q')
+        return group
+
+    def __init__(self, shapes=()):
+        self._groups: dict = {}     # registered class -> {column: array('d')}
+        self._positions: dict = {}  # registered class -> array('q') of insertion positions
+        self._size = 0
+        self.extend(shapes)
+
+    def __len__(self):
+        return self._size
+
+    def add(self, shape: Shape):
+        self.extend((shape,))
+
+    def extend(self, shapes):
+        # One pass per concrete type, each column filled by array.extend over
+        # attrgetter, so the per-shape work stays in C. Every column is built
+        # before any is stored, so a bad shape leaves the batch unchanged.
+        shapes = list(shapes)
+        types = list(map(type, shapes))
+        staged = []
+        for shape_type in set(types):
+            key = self._lookup(shape_type)
+            columns, _ = self._kernels[key]
+            mask = list(map(operator.is_, types, repeat(shape_type)))
+            values = {column: array('d', map(operator.attrgetter(column), compress(shapes, mask)))
+                      for column in columns}
+            staged.append((key, values, array('q', compress(count(self._size), mask))))
+        for key, values, positions in staged:
+            group = self._group(key)
+            for column, column_values in values.items():
+                group[column].extend(column_values)
+            self._positions[key].extend(positions)
+        self._size += len(shapes)
+
+    def add_columns(self, shape_type: type, **columns):
+        # Bulk load shapes straight from column data, no shape objects involved
+        key = self._lookup(shape_type)
+        names, _ = self._kernels[key]
+        if set(columns) != set(names):
+            raise ValueError(f"{shape_type.__name__} needs columns {names}")
+        group = self._group(key)
+        before = len(group[names[0]])
+        for column in names:
+            group[column].extend(columns[column])
+        added = len(group[names[0]]) - before
+        self._positions[key].extend(range(self._size, self._size + added))
+        self._size += added
+
+    def areas_by_type(self) -> dict:
+        areas = {}
+        for key, group in self._groups.items():
+            _, kernel = self._kernels[key]
+            areas[key] = kernel(*group.values())
+        return areas
+
+    def areas(self) -> array:
+        # Areas in the order the shapes were added
+        result = array('d', bytes(8 * self._size))
+        for key, group_areas in self.areas_by_type().items():
+            for position, area in zip(self._positions[key], group_areas):
+                result[position] = area
+        return result
+
+    def total_area(self) -> float:
+        return math.fsum(math.fsum(group_areas) for group_areas in self.areas_by_type().values())
+
+
+# Kernels take whole columns and return the areas for that group
+def circle_areas(radius: array) -> list[float]:
+    pi = math.pi
+    return [pi*r*r for r in radius]
+
+def rectangle_areas(height: array, width: array) -> list[float]:
+    return list(map(operator.mul, height, width))
+
+ShapeBatch.register(Circle, ("radius",), circle_areas)
+ShapeBatch.register(Rectangle, ("height", "width"), rectangle_areas)
+
+batch = ShapeBatch([Circle(radius=5), Rectangle(height=4, width=6), Circle(radius=1)])
+print("batch areas", list(batch.areas()))
+print("batch total", batch.total_area())
+
+shapes = [Circle(radius=i % 10) if i % 2 else Rectangle(height=i % 7, width=3) for i in range(200_000)]
+
+start = time.perf_counter()
+per_object_total = sum(shape.calculate_area() for shape in shapes)
+per_object_time = time.perf_counter() - start
+
+start = time.perf_counter()
+batch = ShapeBatch(shapes)
+build_time = time.perf_counter() - start
+start = time.perf_counter()
+batch_total = batch.total_area()
+batch_time = time.perf_counter() - start
+
+# The same shapes arriving as columns, without building objects first
+radii = array('d', [i % 10 for i in range(1, 200_000, 2)])
+heights = array('d', [i % 7 for i in range(0, 200_000, 2)])
+start = time.perf_counter()
+column_batch = ShapeBatch()
+column_batch.add_columns(Circle, radius=radii)
+column_batch.add_columns(Rectangle, height=heights, width=array('d', [3.0]) * len(heights))
+column_build_time = time.perf_counter() - start
+
+print(f"per object: {per_object_time:.4f}s")
+print(f"batch from objects: build {build_time:.4f}s + total {batch_time:.4f}s")
+print(f"batch from columns: build {column_build_time:.4f}s + total {batch_time:.4f}s")
+print(f"same total: {math.isclose(per_object_total, batch_total) and math.isclose(batch_total, column_batch.total_area())}")
+
 # =======================================
 
  # Liskov substitution principle (LSP)
@@ -288,7 +775,7 @@ class Circle(shape):
     def area(self):
         return math.pi*self.radius**2
     
-    def voulme(self): 
+    def volume(self): 
         raise NotImplementedError("Volume not applicable for 2D shapes.")
     
 class Sphere(shape): 
@@ -298,7 +785,7 @@ class Sphere(shape):
     def area(self):
         return 4*math.pi*self.radius**2
     
-    def voulme(self): 
+    def volume(self): 
         return (4/3)*math.pi*self.radius**3
 
 circle = Circle(5)
@@ -337,7 +824,7 @@ class Sphere(shape3d):
     def area(self):
         return 4*math.pi*self.radius**2
     
-    def voulme(self): 
+    def volume(self): 
         return (4/3)*math.pi*self.radius**3
 
 circle = Circle(5)
@@ -345,6 +832,361 @@ sphere = Sphere(5)
 
 # =======================
 
+# Out-of-core shape datasets
+# Circle and Sphere only describe shapes held in memory. For datasets bigger
+# than RAM the radius column lives on disk as raw doubles, and reductions
+# stream over it through mmap one fixed-size chunk at a time, so peak memory
+# depends on the chunk size and not on the size of the dataset.
+
+import mmap
+import os
+import tempfile
+import tracemalloc
+from array import array
+from bisect import bisect_left, bisect_right
+
+class ShapeDataset:
+    ITEMSIZE = array('d').itemsize
+
+    def __init__(self, path: str, shape_type: type, write_chunk: int = 1 << 16):
+        self.path = path
+        self.shape_type = shape_type
+        self.write_chunk = write_chunk
+
+    def __len__(self):
+        if not os.path.exists(self.path):
+            return 0
+        return os.path.getsize(self.path) // self.ITEMSIZE
+
+    def append(self, radii):
+        # radii can be any iterable (e.g. a generator), it is written out chunk by
+        # chunk. If it fails part way, the chunks already written are cut off again.
+        chunk = array('d')
+        with open(self.path, "ab") as f:
+            start = f.tell()
+            try:
+                for radius in radii:
+                    chunk.append(radius)
+                    if len(chunk) >= self.write_chunk:
+                        chunk.tofile(f)
+                        del chunk[:]
+                chunk.tofile(f)
+            except BaseException:
+                f.truncate(start)
+                raise
+
+    def append_shapes(self, shapes):
+        # Checked as they stream past, so a generator is only consumed once
+        def radii():
+            for shape in shapes:
+                if not isinstance(shape, self.shape_type):
+                    raise TypeError(f"Expected {self.shape_type.__name__}, got {type(shape).__name__}")
+                yield shape.radius
+        self.append(radii())
+
+    def chunks(self, chunk_size: int = 1 << 16):
+        if len(self) == 0:
+            return
+        step = chunk_size * self.ITEMSIZE
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for start in range(0, len(mm), step):
+                chunk = array('d')
+                chunk.frombytes(mm[start:start + step])
+                yield chunk
+
+
+class StreamingStats:
+    def __init__(self, bins: int, low: float, high: float):
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._sum = 0.0
+        self._compensation = 0.0
+        # Fixed bin edges, values outside [low, high] go to underflow/overflow
+        self.edges = [low + (high - low) * i / bins for i in range(bins + 1)]
+        self.histogram = [0] * bins
+        self.underflow = 0
+        self.overflow = 0
+
+    @property
+    def total(self) -> float:
+        return self._sum + self._compensation
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def _add(self, value: float):
+        # Neumaier summation keeps the running total accurate across millions of chunks
+        total = self._sum + value
+        if abs(self._sum) >= abs(value):
+            self._compensation += (self._sum - total) + value
+        else:
+            self._compensation += (value - total) + self._sum
+        self._sum = total
+
+    def update(self, values):
+        if not values:
+            return
+        ordered = sorted(values)
+        self.count += len(ordered)
+        self.min = min(self.min, ordered[0])
+        self.max = max(self.max, ordered[-1])
+        self._add(math.fsum(ordered))
+
+        edges = self.edges
+        self.underflow += bisect_left(ordered, edges[0])
+        self.overflow += len(ordered) - bisect_right(ordered, edges[-1])
+        previous = bisect_left(ordered, edges[0])
+        for i in range(1, len(edges)):
+            # The last bin is closed on the right so `high` itself is counted
+            if i == len(edges) - 1:
+                current = bisect_right(ordered, edges[i])
+            else:
+                current = bisect_left(ordered, edges[i])
+            self.histogram[i - 1] += current - previous
+            previous = current
+
+
+def sphere_area_column(radius) -> list[float]:
+    factor = 4*math.pi
+    return [factor*r*r for r in radius]
+
+def sphere_volume_column(radius) -> list[float]:
+    factor = (4/3)*math.pi
+    return [factor*r*r*r for r in radius]
+
+# Only 3D shapes have a volume, same split as shape2d/shape3d above
+COLUMN_KERNELS = {
+    Circle: {"area": circle_areas},     # Same kernel ShapeBatch uses
+    Sphere: {"area": sphere_area_column, "volume": sphere_volume_column},
+}
+
+def reduce_dataset(dataset: ShapeDataset, measure: str, bins: int = 10,
+                   value_range: tuple[float, float] = (0.0, 1.0), chunk_size: int = 1 << 16) -> StreamingStats:
+    kernels = COLUMN_KERNELS[dataset.shape_type]
+    if measure not in kernels:
+        raise ValueError(f"{measure} not applicable for {dataset.shape_type.__name__}")
+    kernel = kernels[measure]
+
+    stats = StreamingStats(bins, *value_range)
+    for chunk in dataset.chunks(chunk_size):
+        stats.update(kernel(chunk))
+    return stats
+
+
+with tempfile.TemporaryDirectory() as directory:
+    spheres = ShapeDataset(os.path.join(directory, "spheres.f8"), Sphere)
+    spheres.append_shapes(Sphere(radius) for radius in (1, 2))
+    spheres.append((i % 1000) / 100 for i in range(500_000))
+    print("spheres on disk", len(spheres))
+    try:
+        spheres.append_shapes(Sphere(1) if i < 99_999 else Circle(1) for i in range(100_000))
+    except TypeError as e:
+        print(e, "- spheres on disk", len(spheres))
+
+    tracemalloc.start()
+    area_stats = reduce_dataset(spheres, "area", value_range=(0, 1300))
+    volume_stats = reduce_dataset(spheres, "volume", value_range=(0, 4200))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print("area total", area_stats.total, "min", area_stats.min, "max", area_stats.max)
+    print("area histogram", area_stats.histogram)
+    print("volume total", volume_stats.total, "mean", volume_stats.mean)
+    print(f"peak memory while streaming: {peak / 1024:.0f} KiB")
+
+    circles = ShapeDataset(os.path.join(directory, "circles.f8"), Circle)
+    circles.append_shapes([Circle(5)])
+    try:
+        reduce_dataset(circles, "volume")
+    except ValueError as e:
+        print(e)
+
+# =======================
+
+# Memoizing derived properties
+# Rectangle.area() in the LSP example recomputes on every call, even though the
+# width/height setters are the only way its inputs change. @derived caches the
+# result per instance and records which fields it depends on, so a setter only
+# throws away the cached values that actually depend on the field it changed.
+# A cached value is stored on the instance as a C-level callable that shadows
+# the method, so a hit never runs Python code. Counting hits needs a Python
+# call again, so it is off unless a class sets count_hits = True. Misses and
+# invalidations are always counted, per instance.
+
+import functools
+import itertools
+
+class CacheStats:
+    __slots__ = ("hits", "misses", "invalidations")
+
+    def __init__(self, count_hits: bool = True):
+        self.hits = 0 if count_hits else None      # None: not counted, rather than a wrong 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __repr__(self):
+        hits = "" if self.hits is None else f"hits={self.hits}, "
+        return f"CacheStats({hits}misses={self.misses}, invalidations={self.invalidations})"
+
+
+def derived(*depends_on: str):
+    def decorator(func):
+        name = func.__name__
+
+        # Only runs on a miss, later calls find the cached value first
+        @functools.wraps(func)
+        def compute(self):
+            stats = self.cache_stats
+            stats.misses += 1
+            value = func(self)
+            if self.count_hits:
+                def cached():
+                    stats.hits += 1
+                    return value
+            else:
+                cached = itertools.repeat(value).__next__
+            self.__dict__[name] = cached
+            return value
+
+        compute.depends_on = depends_on
+        return compute
+    return decorator
+
+
+class Memoized:
+    count_hits = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # field name -> names of the derived values computed from it
+        dependents: dict[str, set[str]] = {}
+        for name in dir(cls):
+            for field in getattr(getattr(cls, name, None), "depends_on", ()):
+                dependents.setdefault(field, set()).add(name)
+        cls._dependents = {field: tuple(names) for field, names in dependents.items()}
+
+    def __new__(cls, *args, **kwargs):
+        instance = super().__new__(cls)
+        instance.cache_stats = CacheStats(cls.count_hits)
+        return instance
+
+    def _invalidate(self, field: str):
+        cached = self.__dict__
+        for name in self._dependents.get(field, ()):
+            if cached.pop(name, None) is not None:
+                self.cache_stats.invalidations += 1
+
+
+class Rectangle(Memoized, Shape):
+    def __init__(self, height: float = 0.0, width: float = 0.0):
+        self.height = height
+        self.width = width
+
+    @property
+    def width(self)->float:
+        return self._width
+
+    @width.setter
+    def width(self, new_width: float):
+        self._width = new_width
+        self._invalidate("width")
+
+    @property
+    def height(self)->float:
+        return self._height
+
+    @height.setter
+    def height(self, new_height: float):
+        self._height = new_height
+        self._invalidate("height")
+
+    @derived("width", "height")
+    def area(self)->float:
+        return self._width*self._height
+
+class Square(Rectangle):
+    def __init__(self, side:float = 0):
+        super().__init__(side, side)
+
+    @Rectangle.width.setter
+    def width(self, value: float):
+        self._height = value
+        self._width = value
+        self._invalidate("width")
+        self._invalidate("height")
+
+    @Rectangle.height.setter
+    def height(self, value: float):
+        self._width = value
+        self._height = value
+        self._invalidate("width")
+        self._invalidate("height")
+
+class Sphere(Memoized, shape3d):
+    def __init__(self, radius:float = 0.0):
+        self.radius = radius
+
+    @property
+    def radius(self)->float:
+        return self._radius
+
+    @radius.setter
+    def radius(self, new_radius: float):
+        self._radius = new_radius
+        self._invalidate("radius")
+
+    @derived("radius")
+    def area(self):
+        return 4*math.pi*self._radius**2
+
+    @derived("radius")
+    def volume(self):
+        return (4/3)*math.pi*self._radius**3
+
+
+class CountedSphere(Sphere):
+    count_hits = True
+
+rect = Rectangle(height=10, width=5)
+print("area", rect.area(), rect.area())
+rect.width = 6
+print("area after width change", rect.area())
+print("rect", rect.cache_stats)
+
+sq = Square(4)
+sq.width = 5
+print("square area", sq.area())
+
+sphere = CountedSphere(2)
+for _ in range(100_000):
+    sphere.area()
+    sphere.volume()
+sphere.radius = 3
+print("sphere", sphere.area(), sphere.volume())
+print("sphere", sphere.cache_stats)
+
+# Reads of a cached value against recomputing it every time, as the LSP shapes do
+import timeit
+
+class PlainSphere(shape3d):
+    def __init__(self, radius: float = 0.0):
+        self.radius = radius
+
+    def area(self):
+        return 4*math.pi*self.radius**2
+
+    def volume(self):
+        return (4/3)*math.pi*self.radius**3
+
+n = 1_000_000
+for label, shape in (("recomputed", PlainSphere(3)), ("memoized", Sphere(3)), ("memoized, counting hits", CountedSphere(3))):
+    seconds = timeit.timeit("shape.volume()", globals={"shape": shape}, number=n)
+    print(f"{label}: {seconds / n * 1e9:.0f}ns per volume() read")
+
+# =======================
+
 # Dependency Inversion Principle (DIP)
 
 # Bad example 
@@ -397,3 +1239,233 @@ class Car:
 fastEngine = FastEngine()
 c = Car(fastEngine)
 c.start()
+
+# =======================
+
+# Dependency injection container
+# Car(engine) above is still wired by hand. The Container is told how to build
+# each service and how long an instance lives. A singleton is built once, a
+# scoped service once per scope, and a transient on every resolve. Dependencies
+# are read from the type annotations of __init__. compile() runs that
+# reflection once and turns the graph into one flat closure per service, so
+# resolving in the hot path is a dict lookup plus a call. validate() runs
+# before compiling and rejects missing registrations, dependency cycles, and
+# singletons that would capture a scoped service.
+
+import inspect
+import threading
+import time
+import typing
+from enum import Enum
+
+class Lifetime(Enum):
+    SINGLETON = "singleton"
+    SCOPED = "scoped"
+    TRANSIENT = "transient"
+
+_MISSING = object()
+
+class Scope:
+    def __init__(self, container):
+        self._container = container
+        self._instances = {}
+
+    def resolve(self, service):
+        return self._container._resolve(service, self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._instances.clear()
+        return False
+
+class Container:
+    def __init__(self):
+        self._registrations = {}    # service -> (factory, lifetime, dependencies)
+        self._plans = None
+        # Kept outside the plans, so recompiling after a register() keeps every
+        # singleton that was already built
+        self._singletons = {}
+        self._singleton_lock = threading.RLock()     # Building one singleton can build another
+        # container.resolve() runs in the root scope, which has no instances of
+        # its own: a scoped service resolved there would live for the whole process
+        self._root = Scope(self)
+        self._root._instances = None
+
+    def register(self, service, factory=None, lifetime=Lifetime.TRANSIENT):
+        factory = factory if factory is not None else service
+        self._registrations[service] = (factory, lifetime, self._dependencies(factory))
+        self._singletons.pop(service, None)     # A new registration replaces the old instance
+        self._plans = None
+
+    @staticmethod
+    def _dependencies(factory):
+        # [(parameter name, service, keyword only)] for every required parameter
+        target = factory.__init__ if isinstance(factory, type) else factory
+        hints = typing.get_type_hints(target)
+        dependencies = []
+        for name, parameter in inspect.signature(factory).parameters.items():
+            if parameter.default is not parameter.empty or parameter.kind in (parameter.VAR_POSITIONAL, parameter.VAR_KEYWORD):
+                continue
+            if name not in hints:
+                raise ValueError(f"{factory.__name__}: parameter '{name}' needs a type annotation to be injected")
+            dependencies.append((name, hints[name], parameter.kind == parameter.KEYWORD_ONLY))
+        return tuple(dependencies)
+
+    def validate(self):
+        visiting, done = set(), set()
+
+        def visit(service, path):
+            if service not in self._registrations:
+                raise ValueError(f"{' -> '.join(s.__name__ for s in path)} needs {service.__name__}, which is not registered")
+            if service in done:
+                return
+            if service in visiting:
+                cycle = path[path.index(service):] + [service]
+                raise ValueError(f"Dependency cycle: {' -> '.join(s.__name__ for s in cycle)}")
+            visiting.add(service)
+            _, lifetime, dependencies = self._registrations[service]
+            for _, dependency, _ in dependencies:
+                visit(dependency, path + [service])
+                if lifetime is Lifetime.SINGLETON and self._lifetime(dependency) is Lifetime.SCOPED:
+                    raise ValueError(f"Singleton {service.__name__} cannot depend on scoped {dependency.__name__}")
+            visiting.discard(service)
+            done.add(service)
+
+        for service in self._registrations:
+            visit(service, [])
+
+    def _lifetime(self, service):
+        # Effective lifetime: a transient that needs a scoped service is bound to the scope too
+        _, lifetime, dependencies = self._registrations[service]
+        if lifetime is Lifetime.TRANSIENT and any(self._lifetime(d) is Lifetime.SCOPED for _, d, _ in dependencies):
+            return Lifetime.SCOPED
+        return lifetime
+
+    def compile(self):
+        self.validate()
+        plans = {}
+
+        def plan_for(service):
+            if service not in plans:
+                factory, lifetime, dependencies = self._registrations[service]
+                create = self._creator(factory, [(name, plan_for(d), keyword) for name, d, keyword in dependencies])
+                plans[service] = self._with_lifetime(service, lifetime, create)
+            return plans[service]
+
+        for service in self._registrations:
+            plan_for(service)
+        self._plans = plans
+        return plans
+
+    @staticmethod
+    def _creator(factory, dependencies):
+        positional = [plan for _, plan, keyword in dependencies if not keyword]
+        keywords = [(name, plan) for name, plan, keyword in dependencies if keyword]
+        if keywords:
+            return lambda scope: factory(*[plan(scope) for plan in positional], **{name: plan(scope) for name, plan in keywords})
+        if not positional:
+            return lambda scope: factory()
+        if len(positional) == 1:
+            (first,) = positional
+            return lambda scope: factory(first(scope))
+        if len(positional) == 2:
+            first, second = positional
+            return lambda scope: factory(first(scope), second(scope))
+        return lambda scope: factory(*[plan(scope) for plan in positional])
+
+    def _with_lifetime(self, service, lifetime, create):
+        if lifetime is Lifetime.TRANSIENT:
+            return create
+        if lifetime is Lifetime.SCOPED:
+            def scoped(scope):
+                instances = scope._instances
+                if instances is None:
+                    raise ValueError(f"Scoped {service.__name__} must be resolved inside container.scope()")
+                instance = instances.get(service, _MISSING)
+                if instance is _MISSING:
+                    instance = instances[service] = create(scope)
+                return instance
+            return scoped
+
+        singletons, lock = self._singletons, self._singleton_lock
+        def singleton(scope):
+            instance = singletons.get(service, _MISSING)
+            if instance is _MISSING:
+                with lock:
+                    instance = singletons.get(service, _MISSING)
+                    if instance is _MISSING:
+                        instance = singletons[service] = create(scope)
+            return instance
+        return singleton
+
+    def scope(self):
+        return Scope(self)
+
+    def resolve(self, service):
+        return self._resolve(service, self._root)
+
+    def _resolve(self, service, scope):
+        plans = self._plans if self._plans is not None else self.compile()
+        try:
+            plan = plans[service]
+        except KeyError:
+            raise ValueError(f"{service.__name__} is not registered") from None
+        return plan(scope)
+
+
+container = Container()
+container.register(Engine, FastEngine, Lifetime.SINGLETON)
+container.register(Car)
+container.register(EmailSender, CountingEmailSender, Lifetime.SINGLETON)
+container.register(UserService, lifetime=Lifetime.SCOPED)
+container.compile()
+
+c = container.resolve(Car)
+c.start()
+print("engine shared:", container.resolve(Car).engine is c.engine)
+class Horn:
+    pass
+
+container.register(Horn)
+print("engine kept after another register:", container.resolve(Car).engine is c.engine)
+
+with container.scope() as request_scope:
+    service = request_scope.resolve(UserService)
+    print("same service within a scope:", service is request_scope.resolve(UserService))
+    print("same sender across scopes:", service.email_sender is container.scope().resolve(UserService).email_sender)
+
+try:
+    container.resolve(UserService)
+except ValueError as e:
+    print(e)
+
+class Wheel:
+    def __init__(self, car: 'Axle'):
+        self.car = car
+
+class Axle:
+    def __init__(self, wheel: Wheel):
+        self.wheel = wheel
+
+broken = Container()
+broken.register(Wheel)
+broken.register(Axle)
+try:
+    broken.validate()
+except ValueError as e:
+    print(e)
+
+n = 200_000
+start = time.perf_counter()
+for _ in range(n):
+    container.resolve(Car)
+compiled_time = time.perf_counter() - start
+
+engine = FastEngine()
+start = time.perf_counter()
+for _ in range(n):
+    Car(engine)
+manual_time = time.perf_counter() - start
+print(f"resolve(Car): {compiled_time / n * 1e9:.0f}ns, by hand: {manual_time / n * 1e9:.0f}ns")
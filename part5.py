@@ -230,6 +230,1094 @@ print(data_source.values)
 
 data_source.values = [1,2,3,4]
 
+# Delta notifications
+# Every assignment to values above makes Sheet2 re-sum the whole list, even when
+# only one number changed. DeltaDataSource also supports append, update and
+# remove, and hands observers a Change that describes just that edit. Observers
+# that implement on_change(change) get the delta. Plain observers like BarChart
+# still get update(). Assigning values sends a RESET change with the new list.
+
+import math
+import time
+from enum import Enum
+
+class ChangeKind(Enum):
+    RESET = "reset"
+    APPEND = "append"
+    UPDATE = "update"
+    REMOVE = "remove"
+
+class Change:
+    __slots__ = ("kind", "index", "old", "new")
+
+    def __init__(self, kind: ChangeKind, index: int | None = None, old=None, new=None):
+        self.kind = kind
+        self.index = index
+        self.old = old
+        self.new = new
+
+    def __repr__(self):
+        return f"Change({self.kind.value}, index={self.index}, old={self.old}, new={self.new})"
+
+
+class DeltaDataSource(DataSource):
+    @DataSource.values.setter
+    def values(self, values: list[float]) -> None:
+        self._values = list(values)
+        self.notify_change(Change(ChangeKind.RESET, new=self._values))
+
+    def append(self, value: float):
+        self._values.append(value)
+        self.notify_change(Change(ChangeKind.APPEND, len(self._values) - 1, new=value))
+
+    def update(self, index: int, value: float):
+        index = range(len(self._values))[index]     # Normalise negative indexes
+        old = self._values[index]
+        self._values[index] = value
+        self.notify_change(Change(ChangeKind.UPDATE, index, old, value))
+
+    def remove(self, index: int):
+        index = range(len(self._values))[index]
+        old = self._values.pop(index)
+        self.notify_change(Change(ChangeKind.REMOVE, index, old=old))
+
+    def notify_change(self, change: Change):
+        for observer in self.observers:
+            on_change = getattr(observer, "on_change", None)
+            if on_change is None:
+                observer.update()
+            else:
+                on_change(change)
+
+
+class IncrementalSheet2(Sheet2):
+    # Keeps a running total that each change adjusts in O(1). A plain float sum
+    # drifts after many adds and subtracts, so the error term is carried
+    # separately (Neumaier summation) and folded back in when total is read.
+    def __init__(self, data_source):
+        super().__init__(data_source)
+        self._sum = 0.0
+        self._compensation = 0.0
+
+    def _add(self, value: float):
+        new_sum = self._sum + value
+        if abs(self._sum) >= abs(value):
+            self._compensation += (self._sum - new_sum) + value
+        else:
+            self._compensation += (value - new_sum) + self._sum
+        self._sum = new_sum
+
+    def on_change(self, change: Change):
+        if change.kind is ChangeKind.RESET:
+            self._sum = math.fsum(change.new)
+            self._compensation = 0.0
+        elif change.kind is ChangeKind.APPEND:
+            self._add(change.new)
+        elif change.kind is ChangeKind.UPDATE:
+            self._add(change.new)
+            self._add(-change.old)
+        elif change.kind is ChangeKind.REMOVE:
+            self._add(-change.old)
+        self.total = self._sum + self._compensation
+
+    def update(self):
+        self.on_change(Change(ChangeKind.RESET, new=self.data_source.values))
+
+
+delta_source = DeltaDataSource()
+incremental_sheet = IncrementalSheet2(delta_source)
+delta_source.add_observer(incremental_sheet)
+delta_source.add_observer(BarChart(delta_source))
+
+delta_source.values = [1, 2, 3, 4]
+delta_source.append(10)
+delta_source.update(0, 5)
+delta_source.remove(-1)
+print(delta_source.values, "total", incremental_sheet.total)
+
+quiet_source = DeltaDataSource()
+quiet_sheet = IncrementalSheet2(quiet_source)
+quiet_source.add_observer(quiet_sheet)
+
+start = time.perf_counter()
+for i in range(100_000):
+    quiet_source.append(i * 0.1)
+for i in range(0, 100_000, 2):
+    quiet_source.update(i, -i * 0.1)
+incremental_time = time.perf_counter() - start
+print(f"incremental total {quiet_sheet.total!r}, fsum {math.fsum(quiet_source.values)!r}")
+print(f"delta notifications: {incremental_time / 150_000 * 1e6:.2f}us per change over 150k changes")
+
+# Re-summing on every change instead, on a shorter list (cost grows with length)
+n = 10_000
+values = []
+start = time.perf_counter()
+for i in range(n):
+    values.append(i * 0.1)
+    total = sum(values)
+full_time = time.perf_counter() - start
+print(f"re-summing: {full_time / n * 1e6:.2f}us per change over {n} appends")
+
+# Coalescing notifications
+# A feed that assigns values hundreds of times a second makes every observer
+# redo work that the next write throws away. CoalescingDataSource only marks
+# itself dirty on a write and schedules one flush per tick on the running event
+# loop. The flush sends a single RESET change with the latest values, so each
+# observer hears about a burst at most once per tick. Without a running loop
+# (plain scripts like the demos above) it notifies immediately.
+
+import asyncio
+
+class CoalescingMetrics:
+    def __init__(self):
+        self.writes = 0
+        self.notifications = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    @property
+    def coalescing_ratio(self) -> float:
+        # Writes folded into each notification, 1.0 means no coalescing
+        return self.writes / self.notifications if self.notifications else 0.0
+
+    @property
+    def average_latency(self) -> float:
+        return self.total_latency / self.notifications if self.notifications else 0.0
+
+    def record(self, latency: float):
+        self.notifications += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def __repr__(self):
+        return (f"writes={self.writes} notifications={self.notifications} "
+                f"ratio={self.coalescing_ratio:.1f} avg latency={self.average_latency * 1000:.1f}ms "
+                f"max latency={self.max_latency * 1000:.1f}ms")
+
+
+class CoalescingDataSource(DeltaDataSource):
+    def __init__(self, tick: float = 0.05):
+        self.tick = tick
+        self.metrics = CoalescingMetrics()
+        self._dirty_since: float | None = None
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._flush_loop: asyncio.AbstractEventLoop | None = None
+        super().__init__()
+
+    def notify_change(self, change: Change):
+        if not self.observers:
+            return
+        self.metrics.writes += 1
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if self._dirty_since is not None and (loop is not self._flush_loop or loop.is_closed()):
+            # The loop that was going to flush has gone (asyncio.run returned
+            # before the tick), so deliver the pending writes, this one included, now
+            self.flush()
+            return
+        if loop is None:
+            super().notify_change(change)
+            self.metrics.record(0.0)
+            return
+        if self._dirty_since is None:
+            # First write since the last flush: the latency clock starts here
+            self._dirty_since = time.monotonic()
+            self._flush_loop = loop
+            self._flush_handle = loop.call_later(self.tick, self.flush)
+
+    def flush(self):
+        if self._dirty_since is None:
+            return
+        self._flush_handle.cancel()     # No-op when called from the timer itself
+        latency = time.monotonic() - self._dirty_since
+        self._dirty_since = None
+        self._flush_handle = None
+        self._flush_loop = None
+        super().notify_change(Change(ChangeKind.RESET, new=self._values))
+        self.metrics.record(latency)
+
+
+class UpdateCounter(Observer):
+    def __init__(self):
+        self.updates = 0
+
+    def update(self):
+        self.updates += 1
+
+
+async def coalescing_feed(source: CoalescingDataSource, writes: int, interval: float):
+    for i in range(writes):
+        source.values = [i, i + 1, i + 2]
+        await asyncio.sleep(interval)
+    source.flush()      # Deliver the final state without waiting for the tick
+
+
+coalescing_source = CoalescingDataSource(tick=0.05)
+coalescing_sheet = IncrementalSheet2(coalescing_source)
+update_counter = UpdateCounter()
+coalescing_source.add_observer(coalescing_sheet)
+coalescing_source.add_observer(update_counter)
+
+asyncio.run(coalescing_feed(coalescing_source, 500, 0.002))
+print(f"coalesced: {update_counter.updates} updates, last total {coalescing_sheet.total}")
+print(coalescing_source.metrics)
+
+coalescing_source.values = [1, 2, 3]    # No loop running, delivered immediately
+print(f"without a loop: {update_counter.updates} updates, total {coalescing_sheet.total}")
+
+async def write_and_exit(source: CoalescingDataSource, values):
+    source.values = values      # The loop is gone before the tick fires
+
+for values in ([4, 5], [6, 7]):
+    asyncio.run(write_and_exit(coalescing_source, values))
+asyncio.run(coalescing_feed(coalescing_source, 3, 0.0))
+print(f"after loops that exited early: {update_counter.updates} updates, total {coalescing_sheet.total}")
+
+# Concurrent observer dispatch
+# notify_observer() calls observers one after another, so one slow BarChart
+# holds up everyone behind it. DispatchingDataSource hands its observers to a
+# pluggable dispatcher instead. Every dispatcher has the same
+# dispatch(observers, values) -> DispatchReport:
+#   SerialDispatch      the original loop, with failures isolated per observer
+#   ThreadPoolDispatch  I/O-bound observers run concurrently on threads
+#   ProcessPoolDispatch CPU-bound observers: compute(values) runs in a worker
+#                       process and apply(result) runs back in this process
+#   AsyncDispatch       async def update() observers are awaited together on the
+#                       dispatcher's own event loop thread, and plain observers
+#                       run on its thread pool
+# Every observer gets its own timeout (its `timeout` attribute, or the
+# dispatcher's default), counted from when it starts running, not from when it
+# was queued behind busy workers. No observer waits in the queue longer than the
+# longest timeout in the notification. A failing or late observer is recorded in
+# the DispatchReport and never stops the others. Threads and processes can't be
+# killed, so a timed out observer is abandoned and keeps running in the
+# background. Its worker is written off and the pool replaced, so it can't hold
+# up later notifications. Only async observers are actually cancelled.
+
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+
+class DispatchReport:
+    def __init__(self):
+        self.elapsed = 0.0
+        self.completed: list[Observer] = []
+        self.timed_out: list[Observer] = []
+        self.failed: list[tuple[Observer, BaseException]] = []
+
+    def __repr__(self):
+        names = lambda observers: [type(observer).__name__ for observer in observers]
+        return (f"{self.elapsed:.2f}s completed={names(self.completed)} timed out={names(self.timed_out)} "
+                f"failed={[(type(o).__name__, repr(e)) for o, e in self.failed]}")
+
+
+def observer_timeout(observer, default: float | None) -> float | None:
+    return getattr(observer, "timeout", default)
+
+def collect_futures(dispatcher, calls, report: DispatchReport, start: float, poll: float = 0.005):
+    # calls: (observer, timeout, fn, args, on_result), submitted to dispatcher.executor.
+    # A future's clock starts the first time it is seen running, so a timeout can
+    # run over by up to `poll`. Process pool futures count as running once handed
+    # to a worker's call queue, which can be one call ahead of the worker itself.
+    # Nothing waits in the queue past the longest timeout in the dispatch: a call
+    # that hasn't started by then is cancelled and reported as timed out.
+    timeouts = [timeout for _, timeout, _, _, _ in calls]
+    queue_deadline = math.inf if not timeouts or None in timeouts else start + max(timeouts)
+    waiting = {}
+    for call in calls:
+        _, _, fn, args, _ = call
+        waiting[dispatcher.executor.submit(fn, *args)] = call
+    started: dict[concurrent.futures.Future, float] = {}
+    while waiting:
+        done, _ = concurrent.futures.wait(waiting, timeout=poll, return_when=concurrent.futures.FIRST_COMPLETED)
+        now = time.monotonic()
+        for future in done:
+            observer, _, _, _, on_result = waiting.pop(future)
+            try:
+                result = future.result()
+                if on_result is not None:
+                    on_result(result)
+            except Exception as error:
+                report.failed.append((observer, error))
+            else:
+                report.completed.append(observer)
+
+        abandoned = False
+        for future, (observer, timeout, _, _, _) in list(waiting.items()):
+            if future.running():
+                began = started.setdefault(future, now)
+                if timeout is not None and now - began > timeout:
+                    del waiting[future]
+                    report.timed_out.append(observer)
+                    abandoned = True
+            elif now > queue_deadline and future.cancel():
+                del waiting[future]
+                report.timed_out.append(observer)
+
+        if abandoned:
+            # The abandoned call keeps its worker, so calls still queued behind it
+            # move to a fresh pool rather than wait for a worker that may never free up
+            dispatcher.replace_executor()
+            for future, call in list(waiting.items()):
+                if future.cancel():
+                    del waiting[future]
+                    waiting[dispatcher.executor.submit(call[2], *call[3])] = call
+    report.elapsed = time.monotonic() - start
+    return report
+
+
+class SerialDispatch:
+    def __init__(self, timeout: float | None = None):
+        self.timeout = timeout
+
+    def dispatch(self, observers, values) -> DispatchReport:
+        # A serial observer can't be interrupted, so an overrun is only reported
+        report = DispatchReport()
+        start = time.monotonic()
+        for observer in observers:
+            began = time.monotonic()
+            try:
+                observer.update()
+            except Exception as error:
+                report.failed.append((observer, error))
+                continue
+            timeout = observer_timeout(observer, self.timeout)
+            if timeout is not None and time.monotonic() - began > timeout:
+                report.timed_out.append(observer)
+            else:
+                report.completed.append(observer)
+        report.elapsed = time.monotonic() - start
+        return report
+
+    def close(self):
+        pass
+
+
+class ThreadPoolDispatch:
+    # An abandoned observer keeps its thread until it returns, and the
+    # interpreter still waits for it at exit
+    def __init__(self, workers: int = 8, timeout: float | None = 1.0):
+        self.workers = workers
+        self.timeout = timeout
+        self.executor = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix="observer")
+
+    def replace_executor(self):
+        self.executor.shutdown(wait=False)
+        self.executor = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix="observer")
+
+    def dispatch(self, observers, values) -> DispatchReport:
+        start = time.monotonic()
+        calls = [(observer, observer_timeout(observer, self.timeout), observer.update, (), None)
+                 for observer in observers]
+        return collect_futures(self, calls, DispatchReport(), start)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ProcessPoolDispatch:
+    # compute must be a staticmethod of a module level class so it pickles by
+    # name. Only the values are sent to the worker, never the observer itself.
+    # Needs fork.
+    def __init__(self, workers: int | None = None, timeout: float | None = 5.0):
+        self.workers = workers
+        self.timeout = timeout
+        self.executor = self._new_executor()
+
+    def _new_executor(self):
+        return concurrent.futures.ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("fork"))
+
+    def replace_executor(self):
+        self.executor.shutdown(wait=False)
+        self.executor = self._new_executor()
+
+    def dispatch(self, observers, values) -> DispatchReport:
+        start = time.monotonic()
+        report = DispatchReport()
+        calls = []
+        for observer in observers:
+            if not hasattr(observer, "compute"):
+                # Cheap observers don't need a round trip through a worker
+                try:
+                    observer.update()
+                    report.completed.append(observer)
+                except Exception as error:
+                    report.failed.append((observer, error))
+                continue
+            calls.append((observer, observer_timeout(observer, self.timeout), type(observer).compute, (values,), observer.apply))
+        return collect_futures(self, calls, report, start)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class AsyncDispatch:
+    # Runs its own event loop on a background thread, so dispatch() blocks like
+    # the other dispatchers whether or not the caller has a loop running. Async
+    # observers are awaited on that loop, not the caller's. Code already on a
+    # loop can `await dispatcher.dispatch_async(...)` instead. Sync observers
+    # run on a private thread pool that is never waited on. A slot is taken
+    # before submitting, so nothing queues inside the pool. An abandoned
+    # observer gives its slot back and the pool is replaced, because its
+    # thread stays busy.
+    def __init__(self, workers: int = 8, timeout: float | None = 1.0):
+        self.workers = workers
+        self.timeout = timeout
+        self.executor = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix="async-observer")
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="observer-loop", daemon=True)
+        self._thread.start()
+
+    def replace_executor(self):
+        self.executor.shutdown(wait=False)
+        self.executor = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix="async-observer")
+
+    async def _run(self, observer, report: DispatchReport, slots: asyncio.Semaphore, queue_deadline: float):
+        timeout = observer_timeout(observer, self.timeout)
+        if asyncio.iscoroutinefunction(observer.update):
+            try:
+                await asyncio.wait_for(observer.update(), timeout)
+            except asyncio.TimeoutError:
+                report.timed_out.append(observer)
+            except Exception as error:
+                report.failed.append((observer, error))
+            else:
+                report.completed.append(observer)
+            return
+
+        loop = asyncio.get_running_loop()
+        try:
+            # The timeout starts once a slot is free, but no one waits past the deadline
+            wait = None if queue_deadline == math.inf else max(0.0, queue_deadline - loop.time())
+            await asyncio.wait_for(slots.acquire(), wait)
+        except asyncio.TimeoutError:
+            report.timed_out.append(observer)
+            return
+        try:
+            await asyncio.wait_for(loop.run_in_executor(self.executor, observer.update), timeout)
+        except asyncio.TimeoutError:
+            report.timed_out.append(observer)
+            self.replace_executor()
+        except Exception as error:
+            report.failed.append((observer, error))
+        else:
+            report.completed.append(observer)
+        finally:
+            slots.release()
+
+    async def dispatch_async(self, observers, values) -> DispatchReport:
+        report = DispatchReport()
+        start = time.monotonic()
+        timeouts = [observer_timeout(observer, self.timeout) for observer in observers]
+        loop = asyncio.get_running_loop()
+        queue_deadline = math.inf if not timeouts or None in timeouts else loop.time() + max(timeouts)
+        slots = asyncio.Semaphore(self.workers)
+        await asyncio.gather(*(self._run(observer, report, slots, queue_deadline) for observer in observers))
+        report.elapsed = time.monotonic() - start
+        return report
+
+    def dispatch(self, observers, values) -> DispatchReport:
+        return asyncio.run_coroutine_threadsafe(self.dispatch_async(observers, values), self._loop).result()
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class DispatchingDataSource(DataSource):
+    def __init__(self, dispatcher=None):
+        self.dispatcher = dispatcher if dispatcher is not None else SerialDispatch()
+        self.last_report: DispatchReport | None = None
+        super().__init__()
+
+    @DataSource.values.setter
+    def values(self, values: list[float]) -> None:
+        # DataSource's setter goes straight to Subject.notify_observer
+        self._values = values
+        self.notify_observer()
+
+    def notify_observer(self):
+        if not self.observers:
+            return
+        self.last_report = self.dispatcher.dispatch(list(self.observers), self.values)
+
+
+class SlowBarChart(BarChart):
+    # Stands in for a chart that waits on a rendering service
+    timeout = 0.5
+
+    def update(self):
+        time.sleep(0.2)
+
+class HungBarChart(BarChart):
+    timeout = 0.3
+
+    def update(self):
+        time.sleep(0.6)
+
+class BrokenSheet(Sheet2):
+    def update(self):
+        raise ValueError("bad cell reference")
+
+class AsyncBarChart(BarChart):
+    timeout = 0.5
+
+    async def update(self):
+        await asyncio.sleep(0.2)
+
+class HeavySheet(Sheet2):
+    # CPU-bound: a statistic over the values that takes a while to compute
+    timeout = 10.0
+
+    @staticmethod
+    def compute(values):
+        return math.fsum(math.sqrt(abs(value) + k) for value in values for k in range(20_000))
+
+    def apply(self, result):
+        self.total = result
+
+    def update(self):
+        self.apply(self.compute(self.data_source.values))
+
+
+dispatching_source = DispatchingDataSource()
+dispatching_sheet = IncrementalSheet2(dispatching_source)
+for observer in (SlowBarChart(dispatching_source), SlowBarChart(dispatching_source),
+                 SlowBarChart(dispatching_source), HungBarChart(dispatching_source),
+                 BrokenSheet(dispatching_source), dispatching_sheet):
+    dispatching_source.add_observer(observer)
+
+for dispatcher in (SerialDispatch(), ThreadPoolDispatch(), AsyncDispatch()):
+    dispatching_source.dispatcher = dispatcher
+    start = time.monotonic()
+    dispatching_source.values = [1, 2, 3, 4]
+    blocked = time.monotonic() - start
+    print(f"{type(dispatcher).__name__}: {dispatching_source.last_report}, values= blocked {blocked:.2f}s")
+    dispatcher.close()
+
+dispatching_source.observers[:3] = [AsyncBarChart(dispatching_source) for _ in range(3)]
+dispatching_source.dispatcher = AsyncDispatch()
+
+async def notify_from_a_loop():
+    dispatching_source.values = [5, 6]
+
+asyncio.run(notify_from_a_loop())
+print(f"AsyncDispatch from inside a running loop: {dispatching_source.last_report}")
+print("sheet total", dispatching_sheet.total)
+dispatching_source.dispatcher.close()
+
+# More observers than workers: the ones queued behind others still get their full timeout
+class QueuedBarChart(SlowBarChart):
+    timeout = 0.3
+
+queued_source = DispatchingDataSource()
+for _ in range(8):
+    queued_source.add_observer(QueuedBarChart(queued_source))
+for dispatcher in (ThreadPoolDispatch(workers=4), AsyncDispatch(workers=4)):
+    queued_source.dispatcher = dispatcher
+    queued_source.values = [1]
+    report = queued_source.last_report
+    print(f"{type(dispatcher).__name__}, 8 x 0.2s on 4 workers: {report.elapsed:.2f}s, "
+          f"{len(report.completed)} completed, {len(report.timed_out)} timed out")
+    dispatcher.close()
+
+# One worker and hung observers: the notification is still bounded, and the pool
+# serves the next notification instead of waiting for the hung threads
+hung_source = DispatchingDataSource()
+for dispatcher in (ThreadPoolDispatch(workers=1), AsyncDispatch(workers=1)):
+    hung_source.observers = [HungBarChart(hung_source), HungBarChart(hung_source), SlowBarChart(hung_source)]
+    hung_source.dispatcher = dispatcher
+    start = time.monotonic()
+    hung_source.values = [1]
+    blocked = time.monotonic() - start
+    print(f"{type(dispatcher).__name__}, 1 worker, two hung: {hung_source.last_report}, values= blocked {blocked:.2f}s")
+    hung_source.observers[:2] = []
+    hung_source.values = [2]
+    print(f"  next notification: {hung_source.last_report}")
+    dispatcher.close()
+
+if __name__ == "__main__" and "fork" in multiprocessing.get_all_start_methods():
+    heavy_source = DispatchingDataSource()
+    heavy_sheets = [HeavySheet(heavy_source) for _ in range(4)]
+    for heavy_sheet in heavy_sheets:
+        heavy_source.add_observer(heavy_sheet)
+    heavy_values = list(range(50))
+
+    heavy_source.dispatcher = SerialDispatch()
+    heavy_source.values = heavy_values
+    print(f"SerialDispatch, CPU-bound: {heavy_source.last_report}")
+
+    heavy_source.dispatcher = ProcessPoolDispatch()
+    heavy_source.values = heavy_values
+    print(f"ProcessPoolDispatch on {os.cpu_count()} CPU(s), CPU-bound: {heavy_source.last_report}")
+    heavy_source.dispatcher.close()
+
+# Weak observer registry
+# Subject keeps observers in a list: remove_observer() scans the whole list,
+# and a view that is never removed stays alive forever through the subject.
+# ObserverRegistry is a drop-in for that list (append, remove, iteration, len)
+# backed by a dict keyed on id(observer), which keeps insertion order and
+# makes removal O(1). It holds only weak references, and each reference's
+# callback drops the entry once its observer is garbage collected. Whoever
+# created a view has to keep it referenced for as long as it should update.
+
+import random
+import tracemalloc
+import weakref
+
+class ObserverRef(weakref.ref):
+    __slots__ = ("key",)
+
+
+class ObserverRegistry:
+    def __init__(self):
+        refs: dict[int, ObserverRef] = {}
+
+        # Closes over the dict instead of self, so refs never keep the registry alive.
+        # An id can be reused after collection, so only drop the entry if it is still ours.
+        def forget(ref):
+            if refs.get(ref.key) is ref:
+                del refs[ref.key]
+
+        self._refs = refs
+        self._forget = forget
+
+    def append(self, observer):
+        # Adding the same observer twice keeps a single subscription
+        key = id(observer)
+        if key not in self._refs or self._refs[key]() is not observer:
+            ref = ObserverRef(observer, self._forget)
+            ref.key = key
+            self._refs[key] = ref
+
+    def remove(self, observer):
+        ref = self._refs.get(id(observer))
+        if ref is None or ref() is not observer:
+            raise ValueError("observer is not registered")
+        del self._refs[ref.key]
+
+    def __contains__(self, observer):
+        ref = self._refs.get(id(observer))
+        return ref is not None and ref() is observer
+
+    def __len__(self):
+        return len(self._refs)
+
+    def __iter__(self):
+        # Snapshot, so observers can unsubscribe (or be collected) mid-notification
+        observers = [ref() for ref in list(self._refs.values())]
+        return iter([observer for observer in observers if observer is not None])
+
+
+class WeakSubject(Subject):
+    def __init__(self):
+        super().__init__()
+        self.observers = ObserverRegistry()
+
+class WeakDataSource(WeakSubject, DeltaDataSource):
+    pass
+
+
+weak_source = WeakDataSource()
+weak_sheet = IncrementalSheet2(weak_source)
+weak_source.add_observer(weak_sheet)
+weak_source.add_observer(IncrementalSheet2(weak_source))     # Nobody else holds this one
+weak_source.values = [1, 2, 3]
+print(f"registered: {len(weak_source.observers)}, sheet total {weak_sheet.total}")
+del weak_sheet
+print(f"after the last sheet went away: {len(weak_source.observers)}")
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    container = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return container, size
+
+n = 100_000
+views = [UpdateCounter() for _ in range(n)]
+
+def subscribe_all(observers):
+    for view in views:
+        observers.append(view)
+    return observers
+
+view_list, list_bytes = measure(lambda: subscribe_all([]))
+registry, registry_bytes = measure(lambda: subscribe_all(ObserverRegistry()))
+print(f"{n:,} subscribers: list {list_bytes / n:.0f} bytes each, weak registry {registry_bytes / n:.0f} bytes each")
+
+# Churn: detach and re-attach views picked at random while 100k are subscribed
+churn = random.sample(views, 2_000)
+
+start = time.perf_counter()
+for view in churn:
+    view_list.remove(view)
+    view_list.append(view)
+list_time = time.perf_counter() - start
+
+start = time.perf_counter()
+for view in churn:
+    registry.remove(view)
+    registry.append(view)
+registry_time = time.perf_counter() - start
+print(f"detach + attach: list {list_time / len(churn) * 1e6:.1f}us, weak registry {registry_time / len(churn) * 1e6:.2f}us")
+
+start = time.perf_counter()
+for view in registry:
+    view.update()
+print(f"notifying {len(registry):,} subscribers: {time.perf_counter() - start:.4f}s")
+
+del view_list, churn, view
+start = time.perf_counter()
+views.clear()
+print(f"dropping every view: {len(registry)} left registered after {time.perf_counter() - start:.4f}s")
+
+# Rolling window aggregates
+# Dashboards want sum, mean, variance, min and max over the last N values or
+# the last T seconds, not the whole list Sheet2 totals. RollingWindow attaches
+# as an observer and keeps only the values inside the window:
+#   sum, mean, variance  running moments (Welford), adjusted when a value enters
+#                        or leaves the window
+#   min, max             monotonic deques whose front is always the answer
+# Each new value costs amortized O(1), and memory never grows past the window.
+# APPEND changes are streamed in. For other changes:
+#   count windows  reseed from the last N values of the source
+#   time windows   the source's values carry no timestamps, so only the entries
+#                  already in the window are kept, with their own timestamps.
+#                  They are re-read from the source, which picks up UPDATEs, and
+#                  a REMOVE inside the window drops that entry. A RESET or plain
+#                  update() replaces the whole list, so the window empties.
+# Running moments collect a little float drift on very long streams, and a
+# reseed clears it.
+
+import statistics
+from collections import deque
+
+class RollingWindow(Observer):
+    def __init__(self, data_source, size: int | None = None, seconds: float | None = None, clock=time.monotonic):
+        if (size is None) == (seconds is None):
+            raise ValueError("give a window size or a number of seconds, not both")
+        self.data_source = data_source
+        self.size = size
+        self.seconds = seconds
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        self._values: deque[tuple[int, float, float]] = deque()     # (sequence, timestamp, value)
+        self._max: deque[tuple[int, float]] = deque()               # (sequence, value), decreasing
+        self._min: deque[tuple[int, float]] = deque()               # (sequence, value), increasing
+        self._sequence = 0
+        self._sum = 0.0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def update(self):
+        if self.size is not None:
+            self.reseed(self.data_source.values)
+        else:
+            self.reset()
+
+    def on_change(self, change: Change):
+        if change.kind is ChangeKind.APPEND:
+            self.push(change.new)
+        elif self.size is not None:
+            self.reseed(self.data_source.values)
+        elif change.kind is ChangeKind.RESET:
+            self.reset()
+        else:
+            self._refresh_tail(change)
+
+    def reseed(self, values):
+        # Count windows only: the seed is treated as arriving now
+        self.reset()
+        for value in values[-self.size:] if self.size else []:
+            self.push(value)
+
+    def _refresh_tail(self, change: Change):
+        # The window always holds the newest values of the source, so its entry
+        # i lines up with source index len(values) - len(window) + i
+        timestamps = [timestamp for _, timestamp, _ in self._values]
+        if change.kind is ChangeKind.REMOVE:
+            position = change.index - (len(self.data_source.values) + 1 - len(timestamps))
+            if position >= 0:
+                del timestamps[position]
+        values = self.data_source.values
+        tail = values[len(values) - len(timestamps):] if timestamps else []
+        self.reset()
+        for timestamp, value in zip(timestamps, tail):
+            self._push(value, timestamp)
+        self._expire(self.clock())
+
+    def push(self, value: float):
+        self._push(value, self.clock())
+
+    def _push(self, value: float, now: float):
+        sequence = self._sequence
+        self._sequence += 1
+        self._values.append((sequence, now, value))
+
+        self._sum += value
+        n = len(self._values)
+        delta = value - self._mean
+        self._mean += delta / n
+        self._m2 += delta * (value - self._mean)
+
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((sequence, value))
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((sequence, value))
+
+        if self.size is not None:
+            if n > self.size:
+                self._evict()
+        else:
+            self._expire(now)
+
+    def _evict(self):
+        sequence, _, value = self._values.popleft()
+        self._sum -= value
+        n = len(self._values)
+        if n == 0:
+            self._sum = self._mean = self._m2 = 0.0
+        else:
+            old_mean = self._mean
+            self._mean -= (value - old_mean) / n
+            self._m2 = max(0.0, self._m2 - (value - old_mean) * (value - self._mean))
+        if self._max[0][0] == sequence:
+            self._max.popleft()
+        if self._min[0][0] == sequence:
+            self._min.popleft()
+
+    def _expire(self, now: float):
+        cutoff = now - self.seconds
+        while self._values and self._values[0][1] <= cutoff:
+            self._evict()
+
+    def _current(self):
+        # Time windows also shrink while nothing is appended
+        if self.seconds is not None:
+            self._expire(self.clock())
+        return self._values
+
+    def __len__(self):
+        return len(self._current())
+
+    @property
+    def sum(self) -> float:
+        self._current()
+        return self._sum
+
+    @property
+    def mean(self) -> float | None:
+        return self._mean if self._current() else None
+
+    @property
+    def variance(self) -> float | None:
+        # Sample variance, like statistics.variance
+        return self._m2 / (len(self._values) - 1) if len(self._current()) > 1 else None
+
+    @property
+    def min(self) -> float | None:
+        return self._min[0][1] if self._current() else None
+
+    @property
+    def max(self) -> float | None:
+        return self._max[0][1] if self._current() else None
+
+    def __repr__(self):
+        span = f"last {self.size}" if self.size is not None else f"last {self.seconds}s"
+        return (f"RollingWindow({span}: n={len(self)} sum={self.sum:g} mean={self.mean} "
+                f"variance={self.variance} min={self.min} max={self.max})")
+
+
+window_source = DeltaDataSource()
+last_five = RollingWindow(window_source, size=5)
+window_source.add_observer(last_five)
+
+readings = [random.uniform(-50, 50) for _ in range(1_000)]
+for reading in readings:
+    window_source.append(reading)
+print(last_five)
+print(f"expected: mean={statistics.fmean(readings[-5:])} variance={statistics.variance(readings[-5:])} "
+      f"min={min(readings[-5:])} max={max(readings[-5:])}")
+
+window_source.update(-1, 1000.0)     # Not an append, so the window is reseeded
+print(f"after editing the last value: max={last_five.max}")
+
+fake_now = [0.0]
+last_three_seconds = RollingWindow(window_source, seconds=3, clock=lambda: fake_now[0])
+window_source.add_observer(last_three_seconds)
+for value in (4, 8, 15, 16, 23, 42):
+    fake_now[0] += 1
+    window_source.append(value)
+print(last_three_seconds)
+fake_now[0] += 2
+print(f"two quiet seconds later: {last_three_seconds}")
+window_source.update(0, -1.0)       # Left the time window long ago
+window_source.update(-1, 40.0)      # Still inside it
+print(f"after editing an old and a recent value: {last_three_seconds}")
+
+# Cost per value and memory stay flat however large the window or long the stream
+n = 200_000
+stream = [random.random() for _ in range(n)]
+for size in (10, 1_000, 100_000):
+    window = RollingWindow(None, size=size)
+    start = time.perf_counter()
+    for value in stream:
+        window.push(value)
+    elapsed = time.perf_counter() - start
+
+    window = RollingWindow(None, size=size)
+    tracemalloc.start()
+    for value in stream:
+        window.push(value)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"window of {size:,}: {elapsed / n * 1e6:.2f}us per value, peak {peak / 1024:,.0f} KiB, holding {len(window):,}")
+
+# Incremental bar chart
+# BarChart.update() redraws everything on every notification. IncrementalBarChart
+# draws into an off-screen buffer (one fixed-width bytearray row per value) and
+# remembers the values it last drew. Notifications only add row indexes to a
+# dirty set. A frame compares just those rows against what was drawn and
+# redraws the ones that changed, so a frame costs O(changed values). Frames are
+# capped at max_fps. Changes that arrive sooner wait in the dirty set for the
+# next frame, which is scheduled on the running event loop if there is one,
+# or drawn by the next notification or an explicit flush() if not.
+
+class IncrementalBarChart(BarChart):
+    def __init__(self, data_source, width: int = 40, scale: float = 1.0,
+                 max_fps: float | None = 30.0, clock=time.monotonic):
+        super().__init__(data_source)
+        self.width = width
+        self.scale = scale
+        self.frame_interval = 1 / max_fps if max_fps else 0.0
+        self.clock = clock
+        self.buffer: list[bytearray] = []
+        self._bars = [b"#" * length + b" " * (width - length) for length in range(width + 1)]
+        self._drawn: list[float] = []
+        self._dirty: set[int] = set()
+        self._last_frame = -math.inf
+        self._frame_handle: asyncio.TimerHandle | None = None
+        self.frames = 0
+        self.bars_drawn = 0
+
+    def update(self):
+        # No delta to go on, so every row is a candidate and the diff sorts it out
+        self._dirty.update(range(max(len(self.data_source.values), len(self._drawn))))
+        self.request_frame()
+
+    def on_change(self, change: Change):
+        if change.kind in (ChangeKind.APPEND, ChangeKind.UPDATE):
+            self._dirty.add(change.index)
+        elif change.kind is ChangeKind.REMOVE:
+            # Every row after the removed one shifts up
+            self._dirty.update(range(change.index, len(self._drawn)))
+        else:
+            self._dirty.update(range(max(len(change.new), len(self._drawn))))
+        self.request_frame()
+
+    def request_frame(self):
+        wait = self._last_frame + self.frame_interval - self.clock()
+        if wait <= 0:
+            self.flush()
+            return
+        if self._frame_handle is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            self._frame_handle = loop.call_later(wait, self.flush)
+
+    def flush(self):
+        if self._frame_handle is not None:
+            self._frame_handle.cancel()
+            self._frame_handle = None
+        if not self._dirty:
+            return
+        values = self.data_source.values
+        n = len(values)
+        if n < len(self._drawn):
+            del self.buffer[n:]
+            del self._drawn[n:]
+        while len(self._drawn) < n:
+            self.buffer.append(bytearray(self._bars[0]))
+            self._drawn.append(0.0)
+
+        for index in self._dirty:
+            if index >= n:
+                continue
+            value = values[index]
+            if self._drawn[index] == value:
+                continue
+            length = min(self.width, max(0, int(value * self.scale)))
+            self.buffer[index][:] = self._bars[length]
+            self._drawn[index] = value
+            self.bars_drawn += 1
+        self._dirty.clear()
+        self._last_frame = self.clock()
+        self.frames += 1
+
+    def redraw_all(self):
+        # What BarChart.update() amounts to: every row, every time
+        for index, value in enumerate(self.data_source.values):
+            length = min(self.width, max(0, int(value * self.scale)))
+            self.buffer[index][:] = self._bars[length]
+
+    def screen(self) -> str:
+        return "\n".join(row.decode().rstrip() for row in self.buffer)
+
+
+chart_source = DeltaDataSource()
+chart = IncrementalBarChart(chart_source, width=10, max_fps=None)
+chart_source.add_observer(chart)
+chart_source.values = [3, 7, 2]
+chart_source.update(1, 5)
+chart_source.append(9)
+print(chart.screen())
+print(f"{chart.frames} frames, {chart.bars_drawn} bars drawn")
+
+# 1,000 updates inside one simulated second at 30 fps
+chart_now = [0.0]
+capped_source = DeltaDataSource()
+capped_chart = IncrementalBarChart(capped_source, max_fps=30, clock=lambda: chart_now[0])
+capped_source.add_observer(capped_chart)
+capped_source.values = [0.0] * 100
+for i in range(1_000):
+    chart_now[0] += 0.001
+    capped_source.update(i % 100, i % 40)
+capped_chart.flush()
+print(f"1,000 updates in 1s at 30 fps: {capped_chart.frames} frames, {capped_chart.bars_drawn} bars drawn")
+
+# Frame cost against the number of changed values, on a 10,000 bar chart
+n = 10_000
+bench_source = DeltaDataSource()
+bench_chart = IncrementalBarChart(bench_source, max_fps=1, clock=lambda: chart_now[0])
+bench_source.add_observer(bench_chart)
+bench_source.values = [random.uniform(0, 40) for _ in range(n)]
+
+start = time.perf_counter()
+bench_chart.redraw_all()
+print(f"full redraw of {n:,} bars: {(time.perf_counter() - start) * 1e6:,.0f}us")
+
+for changed in (1, 10, 100, 1_000, 10_000):
+    for index in random.sample(range(n), changed):
+        bench_source.update(index, bench_source.values[index] + 1)
+    drawn = bench_chart.bars_drawn
+    start = time.perf_counter()
+    bench_chart.flush()
+    elapsed = time.perf_counter() - start
+    print(f"{changed:>6,} changed: frame {elapsed * 1e6:,.0f}us, {bench_chart.bars_drawn - drawn:,} bars drawn")
+
 # =====================================================
 
 # Facade Pattern 
@@ -507,6 +1595,145 @@ rect.draw()
 shape_actions.duplicate(circle)
 shape_actions.duplicate(rect)
 
+# Prototype registry with pooled clones
+# duplicate() above runs the full constructor for every copy and ShapeActions
+# prints each one. For bulk copies we keep named prototypes in a registry and
+# stamp out compact __slots__ objects: the prototype's fields are copied
+# straight into recycled (or freshly allocated) instances, skipping __init__.
+
+import gc
+import time
+
+class SlotShape(ABC):
+    __slots__ = ()
+
+    @abstractmethod
+    def draw(self):
+        pass
+
+    @abstractmethod
+    def _state(self) -> tuple:
+        pass
+
+    @abstractmethod
+    def _load(self, state: tuple):
+        pass
+
+    def duplicate(self) -> 'SlotShape':
+        clone = type(self).__new__(type(self))
+        clone._load(self._state())
+        return clone
+
+class SlotCircle(SlotShape):
+    __slots__ = ("radius",)
+
+    def __init__(self, radius):
+        self.radius = radius
+
+    def draw(self):
+        print(f"Drawing circle with radius {self.radius}")
+
+    def _state(self):
+        return (self.radius,)
+
+    def _load(self, state):
+        (self.radius,) = state
+
+class SlotRectangle(SlotShape):
+    __slots__ = ("width", "height")
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+    def draw(self):
+        print(f"Drawing rect with width {self.width} and height {self.height}")
+
+    def _state(self):
+        return (self.width, self.height)
+
+    def _load(self, state):
+        self.width, self.height = state
+
+
+class ShapePool:
+    # Free list of released shapes per type, reused before allocating new ones
+    def __init__(self):
+        self._free: dict[type, list[SlotShape]] = {}
+
+    def __len__(self):
+        return sum(len(free) for free in self._free.values())
+
+    def take(self, shape_type: type, n: int) -> list[SlotShape]:
+        free = self._free.get(shape_type, [])
+        reused = free[len(free) - min(n, len(free)):]
+        del free[len(free) - len(reused):]
+        new = shape_type.__new__
+        return reused + [new(shape_type) for _ in range(n - len(reused))]
+
+    def release(self, shapes):
+        for shape in shapes:
+            self._free.setdefault(type(shape), []).append(shape)
+
+
+class PrototypeRegistry:
+    def __init__(self, pool: ShapePool | None = None):
+        self._prototypes: dict[str, SlotShape] = {}
+        self.pool = pool if pool is not None else ShapePool()
+
+    def register(self, name: str, prototype: SlotShape):
+        self._prototypes[name] = prototype
+
+    def unregister(self, name: str):
+        del self._prototypes[name]
+
+    def clone(self, name: str) -> SlotShape:
+        return self.duplicate_many(name, 1)[0]
+
+    def duplicate_many(self, name: str, n: int) -> list[SlotShape]:
+        prototype = self._prototypes[name]
+        shape_type = type(prototype)
+        state = prototype._state()
+        load = shape_type._load
+
+        # Clones can't form reference cycles, so pause the cyclic GC instead of
+        # letting it rescan every new object while millions are allocated
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            clones = self.pool.take(shape_type, n)
+            for clone in clones:
+                load(clone, state)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        return clones
+
+
+registry = PrototypeRegistry()
+registry.register("small circle", SlotCircle(5))
+registry.register("banner", SlotRectangle(5, 10))
+
+registry.clone("small circle").draw()
+registry.clone("banner").draw()
+
+n = 200_000
+
+start = time.perf_counter()
+copies = [circle.duplicate() for _ in range(n)]
+constructor_time = time.perf_counter() - start
+
+start = time.perf_counter()
+clones = registry.duplicate_many("small circle", n)
+registry_time = time.perf_counter() - start
+
+registry.pool.release(clones)
+start = time.perf_counter()
+clones = registry.duplicate_many("small circle", n)
+pooled_time = time.perf_counter() - start
+
+print(f"duplicate(): {constructor_time:.4f}s, duplicate_many: {registry_time:.4f}s, from pool: {pooled_time:.4f}s")
+
 # =====================================
 
 # Abstact factory Pattern